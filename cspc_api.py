@@ -2,103 +2,189 @@
 # -*- coding: utf-8 -*-
 
 import base64
+import csv
+import functools
+import io
 import logging
 import os
+import pathlib
 import sys
 import time
-from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
 import requests
+from requests.adapters import HTTPAdapter
 import xmltodict
-import json
 
-class CspcApi:
-
-    xml_request_dir = os.path.join(os.path.realpath(
-        os.path.dirname(__file__)), 'xml_requests')
-
-    ElementTree.register_namespace('', 'http://www.parinetworks.com/api/schemas/1.1')
+try:
+    import orjson
+
+    def _dumps(obj):
+        # callers of the return_json paths expect text, orjson emits utf-8 bytes
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    import json
+    _dumps = json.dumps
+
+try:
+    # single pass substring search for get_devices_by with a set of values
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import httpx
+except ImportError:
+    # only needed for AsyncCspcApi
+    httpx = None
+
+# default namespace of the CSPC xml api
+_NAMESPACE = 'http://www.parinetworks.com/api/schemas/1.1'
+
+try:
+    # C implementation, considerably faster on large device inventories
+    from lxml import etree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+    # lxml keeps the nsmap of the parsed skeleton, xml.etree needs the default namespace registered
+    ElementTree.register_namespace('', _NAMESPACE)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_payload(path):
+    # skeletons in `xml_request_dir` are static, read each of them only once.
+    # keyed by the full path, so reassigning `CspcApi.xml_request_dir` picks up the new files
+    return pathlib.Path(path).read_bytes()
+
+
+# columns of a CISCO_CNC_CSV seed file, mapped to the arguments of #get_formatted_csv_device_entry
+_CSV_COLS = (
+    'ipaddress',  # IP Address including domain or simply an IP
+    'hostname',  # Host Name
+    None,  # Domain Name
+    None,  # Device Identity
+    None,  # Display Name
+    None,  # SysObjectID
+    None,  # DCR Device Type
+    None,  # MDF Type
+    'snmp_v2_RO',  # Snmp RO
+    'snmp_v2_RW',  # Snmp RW
+    None,  # SnmpV3 User Name  TODO
+    None,  # Snmp V3 Auth Pass  TODO
+    None,  # Snmp V3 Engine ID  TODO
+    None,  # Snmp V3 Auth Algorithm  TODO
+    None,  # RX Boot Mode User
+    None,  # RX Boot Mode Pass
+    'username',  # Primary User (Tacacs User)
+    'password',  # Primary Pass (Tacacs Pass)
+    'enable_password',  # Primary Enable Pass
+    None,  # Http User  TODO
+    None,  # Http Pass  TODO
+    None,  # Http Mode  TODO
+    None,  # Http Port  TODO
+    None,  # Https Port  TODO
+    None,  # Cert Common Name
+    None,  # Secondary User
+    None,  # Secondary Pass
+    None,  # Secondary Enable Pass
+    None,  # Secondary Http User
+    None,  # Secondary Http Pass
+    None,  # Snmp V3 Priv Algorithm  TODO
+    None,  # Snmp V3 Priv Pass  TODO
+    None,  # User Field 1
+    None,  # User Field 2
+    None,  # User Field 3
+    None,  # User Field 4
+)
+
+
+@functools.lru_cache(maxsize=128)
+def _device_template(tags):
+    """Returns a str.format template for a <Device> with the given child tags, i.e. '<Device><IPAddress>{0}</IPAddress></Device>'
+
+    Callers usually send the same fields for every device, so the template is built once per field
+    combination and each device is a single format() call.
+    """
+    return '<Device>' + ''.join(f'<{tag}>{{{i}}}</{tag}>' for i, tag in enumerate(tags)) + '</Device>'
+
+
+def _as_text(payload):
+    return payload.decode('utf-8') if isinstance(payload, bytes) else str(payload)
+
+
+def _text_elem(tag, text):
+    """Returns `<tag>text</tag>` with `text` escaped"""
+    return f'<{tag}>{escape(text or "")}</{tag}>'
+
+
+def _device_fields(elem):
+    """Returns {tag: text} of the children of a <Device>, '' for empty elements
+
+    A single pass over the children, instead of a findtext() scan per key.
+    """
+    # lxml yields comments and processing instructions as children, their tag is not a str
+    return {child.tag: child.text or '' for child in elem if isinstance(child.tag, str)}
+
+
+def _elem_to_dict(elem):
+    """Converts an Element into the dict layout of xmltodict.parse() without the tostring/parse round-trip
+
+    Attributes become '@name' keys, repeated child tags become lists, empty elements become None and
+    text (including text between child elements) is joined into '#text'.
+    Unlike xmltodict, namespaces are dropped: tags are reported by their local name and there are no '@xmlns' keys.
+    """
+    return {elem.tag.rpartition('}')[2]: _elem_value(elem)}
+
+
+def _elem_value(elem):
+    value = {'@' + k: v for k, v in elem.attrib.items()}
+    text = [elem.text or '']
+    for child in elem:
+        # text following a child element belongs to the parent, xmltodict joins it with elem.text
+        text.append(child.tail or '')
+        if not isinstance(child.tag, str):
+            # lxml yields comments and processing instructions as children
+            continue
+        tag = child.tag.rpartition('}')[2]
+        child_value = _elem_value(child)
+        if tag not in value:
+            value[tag] = child_value
+        elif isinstance(value[tag], list):
+            value[tag].append(child_value)
+        else:
+            value[tag] = [value[tag], child_value]
+    text = ''.join(text).strip()
+    if not text:
+        return value or None
+    if not value:
+        return text
+    value['#text'] = text
+    return value
+
+
+class _CspcApiBase:
+    """Request building and response parsing shared by CspcApi and AsyncCspcApi, without any transport"""
 
     def __init__(self, host, user, pwd, verify):
-        '''
-
-        Args:
-            host (str): IP or hostname (without https://) of CSPC
-            user (str): Username for ers API
-            password (str): Password for ers API user
-            verify (bool): enable / disable certificate check for requests to CSPC.
-        '''
+        '''For the arguments see CspcApi'''
 
         self.logger = logging.getLogger('CspcApi')
         self.host = host + ':8001'
         self.user = user
-        self.password = pwd
-        self.creds = ':'.join([self.user, self.password])
-        self.encodedAuth = base64.b64encode(self.creds.encode('utf-8'))
-
-        if not verify:
-            import urllib3
-            urllib3.disable_warnings()
+        # only the encoded header is kept, the password itself is not stored
+        self._auth_header = 'Basic ' + base64.b64encode(f'{user}:{pwd}'.encode('utf-8')).decode('ascii')
+        self.verify = verify
 
         self.headers = {
             'accept': 'application/xml',
-            'Authorization': ' '.join(['Basic', self.encodedAuth.decode('utf-8')]),
+            'Authorization': self._auth_header,
             'cache-control': 'no-cache',
         }
-        self.kwargs = {
-            'verify': verify,
-            'headers': self.headers
-        }
 
     def __str__(self):
-        return f"{type(self).__name__}(\"{self.host[:-5]}\", \"{self.user}\", \"{self.password}\", {self.kwargs['verify']})"
+        return f"{type(self).__name__}(\"{self.host[:-5]}\", \"{self.user}\", \"***\", {self.verify})"
 
     def __eq__(self, other):
-        return (self.host, self.user, self.password, self.kwargs['verify']) == (other.host, other.user, other.password, other.kwargs['verify'])
-    
-    def _info(self):
-        """Performs get request to the CSPC info API endpoint
-
-        Returns:
-            str: response body of CSPC get /cspc/info
-        """
-        link = 'https://' + self.host + '/cspc/info'
-
-        self.logger.debug('GET ' + link + '\nRequest Headers: ' + str(self.headers))
-        response = requests.get(link, **self.kwargs)
-        response_headers = response.headers
-        self.logger.debug('Response Headers:\n' + str(response_headers))
-        body = response.text
-        self.logger.debug('Response Body:\n' + body)
-        return body
-
-    def _xml(self, payload):
-        """ Performs POST xml request to CSPC
-
-        Args:
-            payload (str): string, use _get_xml_payload() to load content from `xml_request_dir`
-
-        Returns:
-            str: body of the CSPC response, usually an xml string
-
-        Example:
-            # Parse the body with ElementTree (from xml.etree import ElementTree) to proceed:
-            payload = self._get_xml_payload('get_details_of_all_devices.xml')
-            all_devices = self._xml(payload)
-            tree = ElementTree.fromstring(all_devices)
-        """
-        link = 'https://' + self.host + '/cspc/xml'
-
-        self.logger.debug('POST ' + link +
-                          '\nRequest Headers: ' + str(self.headers) +
-                          '\nRequest Body: ' + str(payload))
-        response = requests.post(link, payload, **self.kwargs)
-        response_headers = response.headers
-        body = response.text
-        self.logger.debug('Response Headers:\n' + str(response_headers))
-        self.logger.debug('Response Body:\n' + body)
-        if response.status_code != 200:
-            raise RuntimeError(response)
-        return body
+        return (self.host, self.user, self._auth_header, self.verify) == (other.host, other.user, other._auth_header, other.verify)
 
     def _get_xml_payload(self, request_name):
         """Loads the full/skeleton xml request from an example file
@@ -107,30 +193,21 @@ class CspcApi:
             payload (str): xml file in the `xml_request_dir`
 
         Returns:
-            str: xml from file string
+            bytes: xml from file, cached after the first read
         """
-        path = os.path.join(CspcApi.xml_request_dir, request_name)
-        with open(path, 'r') as f:
-            payload = f.read()
-        return payload
+        return _load_payload(pathlib.Path(CspcApi.xml_request_dir) / request_name)
 
     def list_xml_to_json_elem(self, list_of_xml: list):
-        """Takes xml and returns json
+        """Takes a list of xml and returns json
 
         Args:
-            elem_tree (xml.etree.ElementTree) : tree to search
+            list_of_xml (list): of xml.etree.Element or xml strings
 
         Returns:
-            json: dict
+            list: of dict, see #xml_to_json_elem
         """
-        json_data = []
-        for xml in list_of_xml:
-            json_data.append(self.xml_to_json_elem(xml))
-        # convert into json
-        temp = json.dumps(json_data, indent=2)
-        final = json.loads(temp)
-        return final
-    
+        return [self.xml_to_json_elem(xml) for xml in list_of_xml]
+
     def xml_to_json_elem(self, xml: ElementTree or str):
         """Takes xml and returns json
 
@@ -140,10 +217,16 @@ class CspcApi:
         Returns:
             dict: dict
         """
-        xml_string = ElementTree.tostring(xml) if isinstance(xml, ElementTree.Element) else xml
-        json_dict = (xmltodict.parse(xml_string))
-        return json_dict
+        if ElementTree.iselement(xml):
+            return _elem_to_dict(xml)
+        return xmltodict.parse(xml)
 
+    def _format_response(self, request, return_json):
+        """Returns the CSPC response as is, or as json string if `return_json` is set"""
+        if return_json:
+            #pass string to xml to json >> dict >> str
+            return _dumps(self.xml_to_json_elem(request))
+        return request
 
     def _get_xml_elem(self, path, elem_tree):
         """Loads the full/skeleton xml request from an example file
@@ -158,16 +241,311 @@ class CspcApi:
         # https://docs.python.org/3/library/xml.etree.elementtree.html
         # xml library will prefix all elements with their NS from a parsed file.
         ns = {
-            'ns': 'http://www.parinetworks.com/api/schemas/1.1'
+            'ns': _NAMESPACE
         }
         return elem_tree.find(f'.//ns:{path}', namespaces=ns)
 
+    def _parse_devices(self, all_devices, return_json=False):
+        """Parses the body of a get_details_of_all_devices.xml response, see #get_devices"""
+        tree = ElementTree.fromstring(all_devices)
+        devices = list(tree.iter('Device'))
+
+        self.logger.info('num devices: ' + str(len(devices)))
+        if return_json:
+            devices = self.list_xml_to_json_elem(devices)
+        return devices
+
+    def _iter_devices(self, source):
+        """Stream-parses a get_details_of_all_devices.xml response and yields each <Device> element
+
+        The element is removed from the tree as soon as the consumer moves on to the next one, so only
+        a single device is held in memory instead of the whole tree.
+
+        Args:
+            source (file-like): response body
+        """
+        if hasattr(ElementTree, 'XPath'):
+            # lxml, filters the events in C
+            for _, elem in ElementTree.iterparse(source, events=('end',), tag='Device'):
+                yield elem
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+            return
+        # xml.etree does not know the parent of an element, keep track of the open ones
+        parents = []
+        for event, elem in ElementTree.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                parents.append(elem)
+                continue
+            parents.pop()
+            if elem.tag == 'Device':
+                yield elem
+                parents[-1].remove(elem)
+
+    def _unreachable_devices(self, devices):
+        num_devices = 0
+        unreachable_devices = []
+        for elem in devices:
+            num_devices += 1
+            children = _device_fields(elem)
+            if children.get('Status', '').lower() != 'reachable':
+                dev_dict = {key: children.get(key, '') for key in ('Id', 'HostName', 'IPAddress', 'Status')}
+                unreachable_devices.append(dev_dict)
+                # print(dev_dict)
+        self.logger.info('num devices: ' + str(num_devices))
+        return unreachable_devices
+
+    def _check_in_str(self, string_to_check, check: str or set):
+        if isinstance(check, str):
+            return check in string_to_check
+        return any(item in string_to_check for item in check)
+
+    def _compile_check(self, check: str or set):
+        """Returns a function telling whether `check` is contained in a string, see #_check_in_str
+
+        A set is compiled once into an Aho-Corasick automaton (if pyahocorasick is installed),
+        which scans each string once no matter how many items the set holds.
+        """
+        if isinstance(check, str) or ahocorasick is None or not check or '' in check:
+            return functools.partial(self._check_in_str, check=check)
+        automaton = ahocorasick.Automaton()
+        for item in check:
+            automaton.add_word(item, item)
+        automaton.make_automaton()
+        return lambda string_to_check: next(automaton.iter(string_to_check), None) is not None
+
+    def _devices_matching(self, devices, key, value):
+        num_devices = 0
+        matched_devices = []
+        is_match = self._compile_check(value)
+        for device in devices:
+            num_devices += 1
+            device_dict = _device_fields(device)
+            if is_match(device_dict.get(key, '')):
+                matched_devices.append(device_dict)
+        self.logger.info('num devices: ' + str(num_devices))
+        return matched_devices
+
+    def _fill_xml_payload(self, request_name, **lists):
+        """Loads a skeleton from `xml_request_dir` and inserts xml at the end of its list elements
+
+        The request bodies are built as plain strings, creating Element objects for every field
+        does not pay off for bulk requests with thousands of devices.
+
+        Args:
+            request_name (str): xml file in the `xml_request_dir`
+            lists: list tag name = xml string to append to that element, i.e. DeviceList='<Device>...'
+
+        Raises:
+            ValueError: the skeleton has no `</list tag>` to insert before (i.e. a self-closing `<DeviceList/>`)
+        """
+        payload = self._get_xml_payload(request_name)
+        for list_tag, content in lists.items():
+            closing_tag = f'</{list_tag}>'.encode('utf-8')
+            if closing_tag not in payload:
+                raise ValueError(f'{request_name} has no {list_tag}')
+            payload = payload.replace(closing_tag, content.encode('utf-8') + closing_tag, 1)
+        return payload
+
+    def _with_discovery_job_identifier(self, request_name, payload):
+        if b'<DiscoveryJob>' not in payload:
+            raise ValueError(f'{request_name} has no DiscoveryJob')
+        ts = time.time()
+        return payload.replace(b'<DiscoveryJob>', f'<DiscoveryJob identifier="{int(ts)}">'.encode('utf-8'), 1)
+
+    def _device_credentials_snmpv2c_payload(self, credentials):
+        return self._fill_xml_payload('add_multiple_device_credentials.xml',
+                                      DeviceCredentialList=self._snmpv2c_credential_list(credentials))
+
+    def _snmpv2c_credential_list(self, credentials):
+        cred_list = []
+        for cred_name, creds in credentials.items():
+            # SNMPv2c credential
+            cred_list.append(f'<DeviceCredential identifier={quoteattr(cred_name)}>'
+                             '<Protocol>snmpv2c</Protocol>' +
+                             _text_elem('ReadCommunity', creds['snmp_read_community']) +
+                             _text_elem('WriteCommunity', creds['snmp_write_community']) +
+                             '<IpExpressionList>' +
+                             _text_elem('IpExpression', creds['ip_expression']) +
+                             '</IpExpressionList>'
+                             '</DeviceCredential>')
+        return ''.join(cred_list)
+
+    def _device_credentials_ssh_payload(self, credentials):
+        return self._fill_xml_payload('add_multiple_device_credentials.xml',
+                                      DeviceCredentialList=self._ssh_credential_list(credentials))
+
+    def _ssh_credential_list(self, credentials):
+        cred_list = []
+        for cred_name, creds in credentials.items():
+            # SSHv2 credential
+            cred_list.append(f'<DeviceCredential identifier={quoteattr(cred_name)}>'
+                             '<Protocol>sshv2</Protocol>' +
+                             _text_elem('UserName', creds['user']) +
+                             _text_elem('Password', creds['password']) +
+                             _text_elem('EnablePassword', creds['enable_password']) +
+                             '<IpExpressionList>' +
+                             _text_elem('IpExpression', creds['ip_expression']) +
+                             '</IpExpressionList>'
+                             '</DeviceCredential>')
+        return ''.join(cred_list)
+
+    def _device_credentials_bulk_payload(self, snmpv2c_credentials, ssh_credentials):
+        cred_list = self._snmpv2c_credential_list(snmpv2c_credentials) + self._ssh_credential_list(ssh_credentials)
+        return self._fill_xml_payload('add_multiple_device_credentials.xml', DeviceCredentialList=cred_list)
+
+    def _add_multiple_devices_payload(self, devices):
+        return self._fill_xml_payload('add_multiple_devices.xml', DeviceList=self._device_list(devices))
+
+    def _device_list(self, devices):
+        return ''.join(
+            _device_template(tuple(device)).format(*[escape(value or '') for value in device.values()])
+            for device in devices)
+
+    def _discover_multiple_devices_payload(self, ips):
+        request_name = 'discover_multiple_devices.xml'
+        payload = self._fill_xml_payload(request_name, IPAddressList=self._ip_address_list(ips))
+        return self._with_discovery_job_identifier(request_name, payload)
+
+    def _ip_address_list(self, ips):
+        return ''.join(_text_elem('IPAddress', ip) for ip in ips)
+
+    def _discover_and_add_multiple_devices_payload(self, ips, devices):
+        request_name = 'discover_and_add_multiple_devices.xml'
+        payload = self._fill_xml_payload(request_name,
+                                         DeviceList=self._device_list(devices),
+                                         IPAddressList=self._ip_address_list(ips))
+        return self._with_discovery_job_identifier(request_name, payload)
+
+    def _delete_multiple_devices_payload(self, device_array):
+        device_list = ''.join('<Device>' + _text_elem('Id', dev['Id']) + '</Device>' for dev in device_array)
+        return self._fill_xml_payload('delete_multiple_devices.xml', DeviceList=device_list)
+
+    def get_formatted_csv_device_entry(self, ipaddress, hostname='', username='', password='', enable_password='', snmp_v2_RO='', snmp_v2_RW=''):
+        """
+        Returns:
+            str: single line of csv including trailing newline '\\n'
+
+        """
+        line = io.StringIO()
+        self.write_formatted_csv_device_entries(line, [{
+            'ipaddress': ipaddress,
+            'hostname': hostname,
+            'username': username,
+            'password': password,
+            'enable_password': enable_password,
+            'snmp_v2_RO': snmp_v2_RO,
+            'snmp_v2_RW': snmp_v2_RW,
+        }])
+        return line.getvalue()
+
+    def write_formatted_csv_device_entries(self, f, devices):
+        """Writes seed file lines for many devices directly to `f`, see #get_formatted_csv_device_entry
+
+        Args:
+            f (file-like): opened in text mode with newline=''
+            devices (iterable): of dict with the keyword arguments of #get_formatted_csv_device_entry,
+                at minimum ipaddress is required.
+        """
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerows([device.get(col) or '' if col else '' for col in _CSV_COLS] for device in devices)
+
+
+class CspcApi(_CspcApiBase):
+
+    # also used by AsyncCspcApi, see #_get_xml_payload
+    xml_request_dir = pathlib.Path(__file__).resolve().parent / 'xml_requests'
+
+    def __init__(self, host, user, pwd, verify):
+        '''
+
+        Args:
+            host (str): IP or hostname (without https://) of CSPC
+            user (str): Username for ers API
+            password (str): Password for ers API user
+            verify (bool): enable / disable certificate check for requests to CSPC.
+        '''
+        super().__init__(host, user, pwd, verify)
+
+        if not verify:
+            import urllib3
+            urllib3.disable_warnings()
+
+        # single session, so consecutive calls reuse the pooled TCP/TLS connection to CSPC
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.verify = verify
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+    def _info(self):
+        """Performs get request to the CSPC info API endpoint
+
+        Returns:
+            str: response body of CSPC get /cspc/info
+        """
+        link = 'https://' + self.host + '/cspc/info'
+
+        self.logger.debug('GET ' + link + '\nRequest Headers: ' + str(self.headers))
+        response = self.session.get(link)
+        response_headers = response.headers
+        self.logger.debug('Response Headers:\n' + str(response_headers))
+        body = response.text
+        self.logger.debug('Response Body:\n' + body)
+        return body
+
+    def _xml(self, payload):
+        """ Performs POST xml request to CSPC
+
+        Args:
+            payload (bytes|str): utf-8 encoded xml, use _get_xml_payload() to load content from `xml_request_dir`
+
+        Returns:
+            str: body of the CSPC response, usually an xml string
+
+        Example:
+            # To parse the body use the raw bytes of #_xml_response, lxml refuses str with an encoding declaration:
+            payload = self._get_xml_payload('get_details_of_all_devices.xml')
+            all_devices = self._xml_response(payload).content
+            tree = ElementTree.fromstring(all_devices)
+        """
+        return self._xml_response(payload).text
+
+    def _xml_response(self, payload, stream=False):
+        """ Performs POST xml request to CSPC
+
+        Args:
+            payload (bytes|str): utf-8 encoded xml, use _get_xml_payload() to load content from `xml_request_dir`
+            stream (bool): leave the body unread, to be consumed from `response.raw` (see #_stream_devices)
+
+        Returns:
+            requests.Response: the CSPC response, use `.content` to hand the undecoded body to the xml parser
+        """
+        link = 'https://' + self.host + '/cspc/xml'
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            # skip copying possibly large payloads into a log message nobody reads
+            self.logger.debug('POST ' + link +
+                              '\nRequest Headers: ' + str(self.headers) +
+                              '\nRequest Body: ' + _as_text(payload))
+        response = self.session.post(link, data=payload, stream=stream)
+        response_headers = response.headers
+        self.logger.debug('Response Headers:\n' + str(response_headers))
+        if not stream and self.logger.isEnabledFor(logging.DEBUG):
+            # response.text decodes the whole body, get_devices only needs the raw bytes
+            self.logger.debug('Response Body:\n' + response.text)
+        if response.status_code != 200:
+            # a streamed response holds on to its connection until closed
+            response.close()
+            raise RuntimeError(response)
+        return response
 
     def send_and_import_seed_file_csv(self, csv, device_group_name):
         """ upload seedfile to CSPC
 
         Args:
-            csv (str): csv formatted list of devices to add
+            csv (str|file-like|os.PathLike): csv formatted list of devices to add, an opened file
+                (binary mode) or the path of a csv file. See #write_formatted_csv_device_entries
             device_group_name (str): can be empty string
 
         Returns:
@@ -181,11 +559,11 @@ class CspcApi:
                 <JobSchedule runnow="true"/>
                 <ImportSeedFileJob jobName="testimport">
                     <Description>Import SeedFile Job </Description>
-                    <DeviceGroup>{device_group_name}</DeviceGroup>
+                    <DeviceGroup>{escape(device_group_name)}</DeviceGroup>
                     <SeedFileDescr>cnc seed file</SeedFileDescr>
                     <SeedFileFormat>CISCO_CNC_CSV</SeedFileFormat>
                     <FileDetails>
-                    <SeedFileName>{seed_file_name}</SeedFileName>
+                    <SeedFileName>{escape(seed_file_name)}</SeedFileName>
                     </FileDetails>
                     <TriggerDiscovery>true</TriggerDiscovery>
                     <TriggerDav>false</TriggerDav>
@@ -197,14 +575,19 @@ class CspcApi:
 
         link = 'https://' + self.host + '/cspc/seedfile'
 
-        files = {'request': (None, xmlrequest.encode('utf8')), 'file': (
-            seed_file_name, csv.encode('utf8'))}
+        if isinstance(csv, os.PathLike):
+            with open(csv, 'rb') as f:
+                return self.send_and_import_seed_file_csv(f, device_group_name)
 
-        response = requests.post(link, files=files, headers=self.headers, verify=False)
+        # str and file objects are handed to requests as is, the multipart encoder does the utf-8 encoding
+        files = {'request': (None, xmlrequest), 'file': (seed_file_name, csv, 'text/csv')}
 
-        self.logger.debug('POST ' + link +
-                          '\nRequest Headers: ' + str(self.headers) +
-                          '\nRequest Body: ' + str(files))
+        response = self.session.post(link, files=files)
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('POST ' + link +
+                              '\nRequest Headers: ' + str(self.headers) +
+                              '\nRequest Body: ' + str(files))
 
         response_headers = response.headers
         self.logger.debug('Response Headers:\n' + str(response_headers))
@@ -245,14 +628,16 @@ class CspcApi:
             </Device>
         ```
         """
-        all_devices = self._xml(self._get_xml_payload('get_details_of_all_devices.xml'))
-        tree = ElementTree.fromstring(all_devices)
-        devices = tree.findall('.//Device')
+        all_devices = self._xml_response(self._get_xml_payload('get_details_of_all_devices.xml')).content
+        return self._parse_devices(all_devices, return_json)
 
-        self.logger.info('num devices: ' + str(len(devices)))
-        if return_json:
-            devices = self.list_xml_to_json_elem(devices)
-        return devices
+    def _stream_devices(self):
+        """Like #get_devices, but yields the <Device> elements while the response is still being received"""
+        payload = self._get_xml_payload('get_details_of_all_devices.xml')
+        with self._xml_response(payload, stream=True) as response:
+            # let urllib3 undo a gzip/deflate transfer encoding
+            response.raw.decode_content = True
+            yield from self._iter_devices(response.raw)
 
     def get_unreachable_devices(self):
         """returns an array of dict with unreachable devices
@@ -260,27 +645,8 @@ class CspcApi:
         Returns:
             list: of device dictionariers with keys: Id, HostName, IPAddress, Status
         """
-        devices = self.get_devices()
+        return self._unreachable_devices(self._stream_devices())
 
-        self.logger.info('num devices: ' + str(len(devices)))
-        unreachable_devices = []
-        for elem in devices:
-            if elem.findtext('Status').lower() != 'reachable':
-                dev_dict = {
-                    'Id': str(elem.findtext('Id')),
-                    'HostName': str(elem.findtext('HostName')),
-                    'IPAddress': str(elem.findtext('IPAddress')),
-                    'Status': str(elem.findtext('Status'))
-                }
-                unreachable_devices.append(dev_dict)
-                # print(dev_dict)
-        return unreachable_devices
-
-    def _check_in_str(self, string_to_check, check: str or set):
-        if isinstance(check, str):
-            return check in string_to_check
-        return any(item in string_to_check for item in check)
-    
     def get_devices_by(self, key="HostName", value=None):
         """returns an array of dict with devices where the text attribute of the key element matches (case-sensitive) 
         the given value with python 'in' operator
@@ -302,24 +668,8 @@ class CspcApi:
             my_devices = cspc.get_devices_by('IPAddress', '1.2.3.')
         ```
         """
-        #list of element tree objects
-        devices = self.get_devices()
-        self.logger.info('num devices: ' + str(len(devices)))
-        matched_devices = []
-        for device in devices:
-            if self._check_in_str(device.findtext(key), value):
-                device_dict = {}
-                for child in device:
-                    device_dict[child.tag] =  str(device.findtext(child.tag))
-                matched_devices.append(device_dict)
-        return matched_devices
-
-
-    def _add_elem_with_text(self, tag, text, parent):
-        d = ElementTree.Element(tag)
-        d.text = text
-        parent.append(d)
-        return d
+        #stream of element tree objects
+        return self._devices_matching(self._stream_devices(), key, value)
 
     def add_multiple_device_credentials_snmpv2c(self, credentials, return_json=False):
         """Adds snmpv2c credentials for multiple devices by IP expression
@@ -358,24 +708,8 @@ class CspcApi:
             </DeviceCredential>
             ```
         """
-        tree = ElementTree.fromstring(self._get_xml_payload('add_multiple_device_credentials.xml'))
-
-        cred_list = self._get_xml_elem('DeviceCredentialList', tree)
-        for cred_name, creds in credentials.items():
-            # SNMPv2c credential
-            device_credential = ElementTree.Element('DeviceCredential', identifier=cred_name)
-            self._add_elem_with_text('Protocol', 'snmpv2c', device_credential)
-            self._add_elem_with_text('ReadCommunity', creds['snmp_read_community'], device_credential)
-            self._add_elem_with_text('WriteCommunity',creds['snmp_write_community'], device_credential)
-            ip_expr = ElementTree.Element('IpExpressionList')
-            self._add_elem_with_text('IpExpression', creds['ip_expression'], ip_expr)
-            device_credential.append(ip_expr)
-            cred_list.append(device_credential)
-        request = self._xml(ElementTree.tostring(tree, encoding='unicode'))
-        if return_json:
-            #pass string to xml to json >> dict >> str
-            return json.dumps(self.xml_to_json_elem(request))
-        return request
+        request = self._xml(self._device_credentials_snmpv2c_payload(credentials))
+        return self._format_response(request, return_json)
 
     def add_multiple_device_credentials_ssh(self, credentials, return_json=False):
         """Adds sshv2 credentials for multiple devices by IP expression
@@ -414,26 +748,21 @@ class CspcApi:
             </DeviceCredential>
             ```
         """
-        tree = ElementTree.fromstring(self._get_xml_payload('add_multiple_device_credentials.xml'))
+        request = self._xml(self._device_credentials_ssh_payload(credentials))
+        return self._format_response(request, return_json)
 
-        cred_list = self._get_xml_elem('DeviceCredentialList', tree)
-        for cred_name, creds in credentials.items():
-            # SSHv2 credential
-            device_credential = ElementTree.Element('DeviceCredential', identifier=cred_name)
-            self._add_elem_with_text('Protocol', 'sshv2', device_credential)
-            self._add_elem_with_text('UserName', creds['user'], device_credential)
-            self._add_elem_with_text('Password', creds['password'], device_credential)
-            self._add_elem_with_text('EnablePassword', creds['enable_password'], device_credential)
-            ip_expr = ElementTree.Element('IpExpressionList')
-            self._add_elem_with_text('IpExpression', creds['ip_expression'], ip_expr)
-            device_credential.append(ip_expr)
-            cred_list.append(device_credential)
-        request = self._xml(ElementTree.tostring(tree, encoding='unicode'))
-        if return_json:
-            #pass string to xml to json >> dict >> str
-            return json.dumps(self.xml_to_json_elem(request))
-        return request
+    def add_multiple_device_credentials_bulk(self, snmpv2c_credentials=None, ssh_credentials=None, return_json=False):
+        """Adds snmpv2c and sshv2 credentials with a single request to CSPC
 
+        Args:
+            snmpv2c_credentials (dict): as for #add_multiple_device_credentials_snmpv2c
+            ssh_credentials (dict): as for #add_multiple_device_credentials_ssh
+
+        Returns:
+            str: Response of CSPC
+        """
+        request = self._xml(self._device_credentials_bulk_payload(snmpv2c_credentials or {}, ssh_credentials or {}))
+        return self._format_response(request, return_json)
 
     def add_multiple_devices(self, devices, return_json=False):
         """Adds multiple devices to CSPC.
@@ -451,36 +780,25 @@ class CspcApi:
 
         See also: examples/add_devices_and_credentials.py
         """
-        tree = ElementTree.fromstring(self._get_xml_payload('add_multiple_devices.xml'))
-        device_list = self._get_xml_elem('DeviceList', tree)
-        for device in devices:
-            elem = ElementTree.Element('Device')
-            for tag, value in device.items():
-                d = ElementTree.Element(tag)
-                d.text = value
-                elem.append(d)
-
-            device_list.append(elem)
-        request = self._xml(ElementTree.tostring(tree, encoding='unicode'))
-        if return_json:
-            #pass string to xml to json >> dict >> str
-            return json.dumps(self.xml_to_json_elem(request))
-        return request
+        request = self._xml(self._add_multiple_devices_payload(devices))
+        return self._format_response(request, return_json)
 
     def discover_multiple_devices(self, ips, return_json=False):
-        ts = time.time()
-        tree = ElementTree.fromstring(self._get_xml_payload('discover_multiple_devices.xml'))
-        device_list = self._get_xml_elem('IPAddressList', tree)
-        job = self._get_xml_elem('DiscoveryJob', tree)
-        job.set('identifier', str(int(ts)))
-        for ip in ips:
-            elem = ElementTree.Element('IPAddress')
-            elem.text = ip
-            device_list.append(elem)
-        request = self._xml(ElementTree.tostring(tree, encoding='unicode'))
-        if return_json:
-            return json.dumps(self.xml_to_json_elem(request))
-        return request
+        request = self._xml(self._discover_multiple_devices_payload(ips))
+        return self._format_response(request, return_json)
+
+    def discover_and_add_multiple_devices(self, ips, devices, return_json=False):
+        """Adds devices to CSPC and starts a discovery job for a list of IPs with a single request
+
+        Args:
+            ips (list): of IP addresses to discover, as for #discover_multiple_devices
+            devices (list<dict>): devices to add, as for #add_multiple_devices
+
+        Returns:
+            str: Response of CSPC
+        """
+        request = self._xml(self._discover_and_add_multiple_devices_payload(ips, devices))
+        return self._format_response(request, return_json)
 
     def delete_multiple_devices(self, device_array, return_json = False):
         """ Deletes multiple devices by ID from CSPC
@@ -491,64 +809,111 @@ class CspcApi:
         Returns:
             str: Response of CSPC
         """
-        tree = ElementTree.fromstring(self._get_xml_payload('delete_multiple_devices.xml'))
-        device_list = self._get_xml_elem('DeviceList', tree)
-        for dev in device_array:
-            elem = ElementTree.Element('Device')
-            d = ElementTree.Element('Id')
-            d.text = dev['Id']
-            elem.append(d)
-            device_list.append(elem)
-        request = self._xml(ElementTree.tostring(tree, encoding='unicode'))
-        if return_json:
-            #pass string to xml to json >> dict >> str
-            return json.dumps(self.xml_to_json_elem(request))
-        return request
+        request = self._xml(self._delete_multiple_devices_payload(device_array))
+        return self._format_response(request, return_json)
 
-    def get_formatted_csv_device_entry(self, ipaddress, hostname='', username='', password='', enable_password='', snmp_v2_RO='', snmp_v2_RW=''):
-        """
-        Returns:
-            str: single line of csv including trailing newline '\\n'
 
-        """
-        col1_IP_Address_including_domain_or_simply_an_IP = ipaddress
-        col2_Host_Name = hostname
-        col3_Domain_Name = ''
-        col4_Device_Identity = ''
-        col5_Display_Name = ''
-        col6_SysObjectID = ''
-        col7_DCR_Device_Type = ''
-        col8_MDF_Type = ''
-        col9_Snmp_RO = snmp_v2_RO
-        col10_Snmp_RW = snmp_v2_RW
-        col11_SnmpV3_User_Name = ''  # TODO
-        col12_Snmp_V3_Auth_Pass = ''  # TODO
-        col13_Snmp_V3_Engine_ID = ''  # TODO
-        col14_Snmp_V3_Auth_Algorithm = ''  # TODO
-        col15_RX_Boot_Mode_User = ''
-        col16_RX_Boot_Mode_Pass = ''
-        col17_Primary_User_Tacacs_User = username
-        col18_Primary_Pass_Tacacs_Pass = password
-        col19_Primary_Enable_Pass = enable_password
-        col20_Http_User = ''  # TODO
-        col21_Http_Pass = ''  # TODO
-        col22_Http_Mode = ''  # TODO
-        col23_Http_Port = ''  # TODO
-        col24_Https_Port = ''  # TODO
-        col25_Cert_Common_Name = ''
-        col26_Secondary_User = ''
-        col27_Secondary_Pass = ''
-        col28_Secondary_Enable_Pass = ''
-        col29_Secondary_Http_User = ''
-        col30_Secondary_Http_Pass = ''
-        col31_Snmp_V3_Priv_Algorithm = ''  # TODO
-        col32_Snmp_V3_Priv_Pass = ''  # TODO
-        col33_User_Field_1 = ''
-        col34_User_Field_2 = ''
-        col35_User_Field_3 = ''
-        col36_User_Field_4 = ''
-
-        return f'{col1_IP_Address_including_domain_or_simply_an_IP},{col2_Host_Name},{col3_Domain_Name},{col4_Device_Identity},{col5_Display_Name},{col6_SysObjectID},{col7_DCR_Device_Type},{col8_MDF_Type},{col9_Snmp_RO},{col10_Snmp_RW},{col11_SnmpV3_User_Name},{col12_Snmp_V3_Auth_Pass},{col13_Snmp_V3_Engine_ID},{col14_Snmp_V3_Auth_Algorithm},{col15_RX_Boot_Mode_User},{col16_RX_Boot_Mode_Pass},{col17_Primary_User_Tacacs_User},{col18_Primary_Pass_Tacacs_Pass},{col19_Primary_Enable_Pass},{col20_Http_User},{col21_Http_Pass},{col22_Http_Mode},{col23_Http_Port},{col24_Https_Port},{col25_Cert_Common_Name},{col26_Secondary_User},{col27_Secondary_Pass},{col28_Secondary_Enable_Pass},{col29_Secondary_Http_User},{col30_Secondary_Http_Pass},{col31_Snmp_V3_Priv_Algorithm},{col32_Snmp_V3_Priv_Pass},{col33_User_Field_1},{col34_User_Field_2},{col35_User_Field_3},{col36_User_Field_4}\n'
+class AsyncCspcApi(_CspcApiBase):
+    """asyncio variant of CspcApi, to run independent CSPC calls concurrently
+
+    The coroutines mirror the CspcApi methods of the same name, sharing one http/2 connection.
+    send_and_import_seed_file_csv is not available, use CspcApi for seed file uploads.
+    Requires httpx with http2 support: pip install 'httpx[http2]'
+
+    Example:
+    ```
+        async with AsyncCspcApi('<IP of your CSPC server>', 'admin', 'admin_pass', verify=False) as cspc:
+            unreachable, _ = await asyncio.gather(cspc.get_unreachable_devices(),
+                                                  cspc.discover_multiple_devices(['1.2.3.4']))
+    ```
+    """
+
+    def __init__(self, host, user, pwd, verify):
+        super().__init__(host, user, pwd, verify)
+        if httpx is None:
+            raise ImportError("AsyncCspcApi requires httpx: pip install 'httpx[http2]'")
+        self.aclient = httpx.AsyncClient(verify=verify, headers=self.headers, http2=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.aclient.aclose()
+
+    async def _info(self):
+        link = 'https://' + self.host + '/cspc/info'
+
+        self.logger.debug('GET ' + link + '\nRequest Headers: ' + str(self.headers))
+        response = await self.aclient.get(link)
+        self.logger.debug('Response Headers:\n' + str(response.headers))
+        body = response.text
+        self.logger.debug('Response Body:\n' + body)
+        return body
+
+    async def _xml(self, payload):
+        return (await self._xml_response(payload)).text
+
+    async def _xml_response(self, payload):
+        link = 'https://' + self.host + '/cspc/xml'
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            # skip copying possibly large payloads into a log message nobody reads
+            self.logger.debug('POST ' + link +
+                              '\nRequest Headers: ' + str(self.headers) +
+                              '\nRequest Body: ' + _as_text(payload))
+        response = await self.aclient.post(link, content=payload)
+        self.logger.debug('Response Headers:\n' + str(response.headers))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Response Body:\n' + response.text)
+        if response.status_code != 200:
+            raise RuntimeError(response)
+        return response
+
+    async def get_devices(self, return_json=False):
+        all_devices = (await self._xml_response(self._get_xml_payload('get_details_of_all_devices.xml'))).content
+        return self._parse_devices(all_devices, return_json)
+
+    async def _stream_devices(self):
+        # the body is read in full, but still parsed incrementally to keep a single device in memory
+        all_devices = (await self._xml_response(self._get_xml_payload('get_details_of_all_devices.xml'))).content
+        return self._iter_devices(io.BytesIO(all_devices))
+
+    async def get_unreachable_devices(self):
+        return self._unreachable_devices(await self._stream_devices())
+
+    async def get_devices_by(self, key="HostName", value=None):
+        return self._devices_matching(await self._stream_devices(), key, value)
+
+    async def add_multiple_device_credentials_snmpv2c(self, credentials, return_json=False):
+        request = await self._xml(self._device_credentials_snmpv2c_payload(credentials))
+        return self._format_response(request, return_json)
+
+    async def add_multiple_device_credentials_ssh(self, credentials, return_json=False):
+        request = await self._xml(self._device_credentials_ssh_payload(credentials))
+        return self._format_response(request, return_json)
+
+    async def add_multiple_device_credentials_bulk(self, snmpv2c_credentials=None, ssh_credentials=None, return_json=False):
+        request = await self._xml(self._device_credentials_bulk_payload(snmpv2c_credentials or {}, ssh_credentials or {}))
+        return self._format_response(request, return_json)
+
+    async def add_multiple_devices(self, devices, return_json=False):
+        request = await self._xml(self._add_multiple_devices_payload(devices))
+        return self._format_response(request, return_json)
+
+    async def discover_multiple_devices(self, ips, return_json=False):
+        request = await self._xml(self._discover_multiple_devices_payload(ips))
+        return self._format_response(request, return_json)
+
+    async def discover_and_add_multiple_devices(self, ips, devices, return_json=False):
+        request = await self._xml(self._discover_and_add_multiple_devices_payload(ips, devices))
+        return self._format_response(request, return_json)
+
+    async def delete_multiple_devices(self, device_array, return_json=False):
+        request = await self._xml(self._delete_multiple_devices_payload(device_array))
+        return self._format_response(request, return_json)
 
 
 def _setup_logging():
@@ -4,8 +4,7 @@ import sys
 path = os.path.join(os.path.dirname(__file__), '..')
 sys.path.append(path)
 
-from cspc_api import CspcApi
-from xml.etree import ElementTree
+from cspc_api import CspcApi, ElementTree
 
 def discover_devices(deviceIps):
     tree = ElementTree.fromstring(cspc._get_xml_payload('discover_multiple_devices.xml'))
@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+import os
+import sys
+#Import cspc_api using the directory one level up as root
+path = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(path)
+import cspc_api
+from cspc_api import AsyncCspcApi, CspcApi
+from test_devices import DEVICES
+
+OK = b'<?xml version="1.0" encoding="UTF-8"?><Response requestId=""><Status>ok</Status></Response>'
+
+@unittest.skipIf(cspc_api.httpx is None, 'httpx not installed')
+class Test_Async(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        body = DEVICES if b'all="true"' in request.content else OK
+        return cspc_api.httpx.Response(200, content=body)
+
+    async def client(self):
+        cspc = AsyncCspcApi("1.1.1.1", "user", "pw", True)
+        await cspc.aclient.aclose()
+        cspc.aclient = cspc_api.httpx.AsyncClient(transport=cspc_api.httpx.MockTransport(self.handler), headers=cspc.headers)
+        return cspc
+
+    def test_gather(self):
+        """independent calls run concurrently on one client and return the same results as CspcApi."""
+        async def run():
+            async with await self.client() as cspc:
+                return await asyncio.gather(
+                    cspc.get_unreachable_devices(),
+                    cspc.get_devices_by('HostName', 'switch'),
+                    cspc.add_multiple_devices([{'IPAddress': '1.2.3.6'}], return_json=True),
+                    cspc.delete_multiple_devices([{'Id': '2'}]),
+                )
+        unreachable, matched, added, deleted = asyncio.run(run())
+        assert [d['Id'] for d in unreachable] == ['2', '3']
+        assert [d['Id'] for d in matched] == ['1']
+        assert added == cspc_api._dumps({'Response': {'@requestId': '', 'Status': 'ok'}})
+        assert deleted == OK.decode('utf-8')
+        assert len(self.requests) == 4
+        assert all(r.headers['Authorization'].startswith('Basic ') for r in self.requests)
+
+    def test_not_a_cspc_api(self):
+        """coroutines do not masquerade as the blocking api, and there is no blocking seed file upload."""
+        async def run():
+            async with await self.client() as cspc:
+                return cspc
+        cspc = asyncio.run(run())
+        assert not isinstance(cspc, CspcApi)
+        assert not hasattr(cspc, 'send_and_import_seed_file_csv')
+        assert not hasattr(cspc, 'session')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,9 +10,10 @@ class Test_Dunders(unittest.TestCase):
     def test__eq__(self):
         """tests the dunder equal method."""
         assert CspcApi("1.1.1.1", "user", "pw", True) == CspcApi("1.1.1.1", "user", "pw", True)
+        assert CspcApi("1.1.1.1", "user", "pw", True) != CspcApi("1.1.1.1", "user", "other", True)
 
     def test__str__(self):
-        """tests the dunder str method."""
-        assert str(CspcApi("1.1.1.1", "user", "pw", True)) == 'CspcApi("1.1.1.1", "user", "pw", True)'
+        """tests the dunder str method, the password must not show up."""
+        assert str(CspcApi("1.1.1.1", "user", "pw", True)) == 'CspcApi("1.1.1.1", "user", "***", True)'
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,117 @@
+import io
+import unittest
+import os
+import sys
+from unittest import mock
+import requests
+#Import cspc_api using the directory one level up as root
+path = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(path)
+import cspc_api
+from cspc_api import CspcApi
+
+DEVICES = b'''<?xml version="1.0" encoding="UTF-8"?>
+<Response requestId="">
+  <Manage>
+    <Get operationId="1">
+      <DeviceList>
+        <Device><Id>1</Id><HostName>switch1</HostName><IPAddress>1.2.3.4</IPAddress><Status>Reachable</Status><SysLocation><![CDATA[floor 1 & 2]]></SysLocation></Device>
+        <Device><Id>2</Id><HostName>router2</HostName><IPAddress>1.2.3.5</IPAddress><Status>Unreachable</Status></Device>
+        <Device><Id>3</Id><HostName></HostName><IPAddress>10.0.0.1</IPAddress><Status>unknown</Status></Device>
+      </DeviceList>
+    </Get>
+  </Manage>
+</Response>'''
+
+class Test_Devices(unittest.TestCase):
+    def setUp(self):
+        self.cspc = CspcApi("1.1.1.1", "user", "pw", True)
+
+    def stream(self, body=DEVICES):
+        return self.cspc._iter_devices(io.BytesIO(body))
+
+    def test_devices_matching_keys(self):
+        """matched devices hold only the tags of that device."""
+        devices = self.cspc._devices_matching(self.stream(), 'IPAddress', '1.2.3.')
+        assert devices == [
+            {'Id': '1', 'HostName': 'switch1', 'IPAddress': '1.2.3.4', 'Status': 'Reachable', 'SysLocation': 'floor 1 & 2'},
+            {'Id': '2', 'HostName': 'router2', 'IPAddress': '1.2.3.5', 'Status': 'Unreachable'},
+        ]
+
+    def test_devices_matching_missing_text(self):
+        """an empty or missing tag matches as '' (instead of 'None' or a TypeError)."""
+        assert [d['Id'] for d in self.cspc._devices_matching(self.stream(), 'HostName', '')] == ['1', '2', '3']
+        assert [d['Id'] for d in self.cspc._devices_matching(self.stream(), 'SysLocation', '')] == ['1', '2', '3']
+        assert self.cspc._devices_matching(self.stream(), 'SysLocation', 'None') == []
+        assert self.cspc._devices_matching(self.stream(), 'HostName', 'switch1')[0]['SysLocation'] == 'floor 1 & 2'
+
+    def check_sets(self):
+        matching = self.cspc._devices_matching
+        assert [d['Id'] for d in matching(self.stream(), 'HostName', {'router', 'switch'})] == ['1', '2']
+        assert [d['Id'] for d in matching(self.stream(), 'IPAddress', {'10.0.', 'nope'})] == ['3']
+        assert matching(self.stream(), 'HostName', set()) == []
+        assert [d['Id'] for d in matching(self.stream(), 'HostName', {'', 'nope'})] == ['1', '2', '3']
+
+    @unittest.skipIf(cspc_api.ahocorasick is None, 'pyahocorasick is not installed')
+    def test_devices_matching_set_automaton(self):
+        """a set of values matches any of them, compiled into an automaton."""
+        self.check_sets()
+
+    def test_devices_matching_set_fallback(self):
+        """the same matches without pyahocorasick."""
+        with mock.patch.object(cspc_api, 'ahocorasick', None):
+            self.check_sets()
+
+    def test_unreachable_devices(self):
+        """unreachable devices keep only their id, name, address and status, empty text as ''."""
+        assert self.cspc._unreachable_devices(self.stream()) == [
+            {'Id': '2', 'HostName': 'router2', 'IPAddress': '1.2.3.5', 'Status': 'Unreachable'},
+            {'Id': '3', 'HostName': '', 'IPAddress': '10.0.0.1', 'Status': 'unknown'},
+        ]
+
+    def test_unreachable_devices_no_status(self):
+        """a device without a status counts as unreachable."""
+        body = DEVICES.replace(b'<Status>Reachable</Status>', b'')
+        assert self.cspc._unreachable_devices(self.stream(body))[0] == \
+            {'Id': '1', 'HostName': 'switch1', 'IPAddress': '1.2.3.4', 'Status': ''}
+
+    def test_devices_comment(self):
+        """comments inside a <Device> are not reported as fields."""
+        body = DEVICES.replace(b'<Id>1</Id>', b'<Id>1</Id><!-- note --><?pi x?>')
+        assert self.cspc._devices_matching(self.stream(body), 'Id', '1')[0] == \
+            {'Id': '1', 'HostName': 'switch1', 'IPAddress': '1.2.3.4', 'Status': 'Reachable', 'SysLocation': 'floor 1 & 2'}
+        body = DEVICES.replace(b'<Id>2</Id>', b'<Id>2</Id><!-- note -->')
+        assert self.cspc._unreachable_devices(self.stream(body))[0] == \
+            {'Id': '2', 'HostName': 'router2', 'IPAddress': '1.2.3.5', 'Status': 'Unreachable'}
+
+    def test_iter_devices_stream(self):
+        """devices are read one by one from a file-like body."""
+        assert [device.findtext('Id') for device in self.stream()] == ['1', '2', '3']
+
+    def test_iter_devices_released(self):
+        """earlier devices are dropped from the tree once the consumer moves on."""
+        parsers = []
+        iterparse = cspc_api.ElementTree.iterparse
+        def record(*args, **kwargs):
+            parsers.append(iterparse(*args, **kwargs))
+            return parsers[-1]
+        with mock.patch.object(cspc_api.ElementTree, 'iterparse', record):
+            for device in self.stream():
+                assert device.findtext('Id')
+        assert len(parsers[0].root.find('.//DeviceList')) <= 1
+
+    def test_xml_response_closes_on_error(self):
+        """a failed (streamed) request does not keep its connection."""
+        closed = []
+        response = requests.Response()
+        response.status_code = 500
+        response.raw = io.BytesIO(b'')
+        response.raw.release_conn = lambda: closed.append(True)
+        self.cspc.session.post = lambda *args, **kwargs: response
+        with self.assertRaises(RuntimeError):
+            self.cspc._xml_response(b'', stream=True)
+        assert closed
+        assert response.raw.closed
+
+if __name__ == '__main__':
+    unittest.main()
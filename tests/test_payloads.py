@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+import os
+import sys
+from unittest import mock
+#Import cspc_api using the directory one level up as root
+path = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(path)
+from cspc_api import CspcApi, ElementTree
+
+NS = {'ns': 'http://www.parinetworks.com/api/schemas/1.1'}
+
+class Test_Payloads(unittest.TestCase):
+    def setUp(self):
+        self.cspc = CspcApi("1.1.1.1", "user", "pw", True)
+
+    def test_xml_request_dir_reassigned(self):
+        """payloads are loaded from the current `xml_request_dir`, not from a stale cache."""
+        original = CspcApi.xml_request_dir
+        self.cspc._get_xml_payload('add_multiple_devices.xml')
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'add_multiple_devices.xml'), 'wb') as f:
+                f.write(b'<Request/>')
+            try:
+                CspcApi.xml_request_dir = tmp
+                assert self.cspc._get_xml_payload('add_multiple_devices.xml') == b'<Request/>'
+            finally:
+                CspcApi.xml_request_dir = original
+
+    def custom_skeleton(self, request_name, skeleton):
+        """Returns a context manager pointing `xml_request_dir` at a directory holding `skeleton`"""
+        tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(tmp.name, request_name), 'wb') as f:
+            f.write(skeleton)
+        patch = mock.patch.object(CspcApi, 'xml_request_dir', tmp.name)
+        self.addCleanup(tmp.cleanup)
+        return patch
+
+    def test_self_closing_list_rejected(self):
+        """a skeleton without a closing list tag raises instead of sending an empty list."""
+        with self.custom_skeleton('add_multiple_devices.xml', b'<Request><DeviceList/></Request>'):
+            with self.assertRaisesRegex(ValueError, 'add_multiple_devices.xml has no DeviceList'):
+                self.cspc._add_multiple_devices_payload([{'IPAddress': '1.2.3.4'}])
+
+    def test_missing_discovery_job_rejected(self):
+        """a skeleton whose DiscoveryJob cannot take the identifier raises."""
+        skeleton = b'<Request><DiscoveryJob ><IPAddressList></IPAddressList></DiscoveryJob></Request>'
+        with self.custom_skeleton('discover_multiple_devices.xml', skeleton):
+            with self.assertRaisesRegex(ValueError, 'discover_multiple_devices.xml has no DiscoveryJob'):
+                self.cspc._discover_multiple_devices_payload(['1.2.3.4'])
+
+    def test_add_multiple_devices(self):
+        """device fields end up escaped in the DeviceList of the request."""
+        tree = ElementTree.fromstring(self.cspc._add_multiple_devices_payload([
+            {'HostName': 'a<b&c', 'IPAddress': '1.2.3.4'},
+            {'IPAddress': '1.2.3.5'},
+        ]))
+        devices = tree.findall('.//ns:DeviceList/ns:Device', namespaces=NS)
+        assert [d.findtext('ns:HostName', namespaces=NS) for d in devices] == ['a<b&c', None]
+        assert [d.findtext('ns:IPAddress', namespaces=NS) for d in devices] == ['1.2.3.4', '1.2.3.5']
+
+    def test_device_credentials_snmpv2c(self):
+        """credential name is quoted as identifier attribute."""
+        tree = ElementTree.fromstring(self.cspc._device_credentials_snmpv2c_payload({
+            'my "snmp"': {'ip_expression': '*.*.*.*', 'snmp_read_community': 'public', 'snmp_write_community': 'pri&vate'},
+        }))
+        cred = tree.find('.//ns:DeviceCredentialList/ns:DeviceCredential', namespaces=NS)
+        assert cred.get('identifier') == 'my "snmp"'
+        assert cred.findtext('ns:WriteCommunity', namespaces=NS) == 'pri&vate'
+        assert cred.findtext('ns:IpExpressionList/ns:IpExpression', namespaces=NS) == '*.*.*.*'
+
+    def test_discover_multiple_devices(self):
+        """ips are listed and the job gets an identifier."""
+        tree = ElementTree.fromstring(self.cspc._discover_multiple_devices_payload(['1.1.1.1', '2.2.2.2']))
+        ips = tree.findall('.//ns:IPAddressList/ns:IPAddress', namespaces=NS)
+        assert [ip.text for ip in ips] == ['1.1.1.1', '2.2.2.2']
+        assert tree.find('.//ns:DiscoveryJob', namespaces=NS).get('identifier')
+
+    def test_delete_multiple_devices(self):
+        """only the device ids are sent."""
+        tree = ElementTree.fromstring(self.cspc._delete_multiple_devices_payload([{'Id': '63', 'HostName': 'x'}]))
+        ids = tree.findall('.//ns:DeviceList/ns:Device/ns:Id', namespaces=NS)
+        assert [i.text for i in ids] == ['63']
+
+    def test_device_credentials_bulk(self):
+        """snmpv2c and ssh credentials share one DeviceCredentialList."""
+        tree = ElementTree.fromstring(self.cspc._device_credentials_bulk_payload(
+            {'snmp': {'ip_expression': '*.*.*.*', 'snmp_read_community': 'public', 'snmp_write_community': 'private'}},
+            {'ssh': {'ip_expression': '*.*.*.*', 'user': 'admin', 'password': 'pw', 'enable_password': 'en'}},
+        ))
+        creds = tree.findall('.//ns:DeviceCredentialList/ns:DeviceCredential', namespaces=NS)
+        assert [c.findtext('ns:Protocol', namespaces=NS) for c in creds] == ['snmpv2c', 'sshv2']
+
+    def test_discover_and_add_multiple_devices(self):
+        """devices to add and ips to discover go into the same request."""
+        tree = ElementTree.fromstring(self.cspc._discover_and_add_multiple_devices_payload(
+            ['1.1.1.1'], [{'IPAddress': '1.2.3.4'}]))
+        assert tree.findtext('.//ns:Add/ns:DeviceList/ns:Device/ns:IPAddress', namespaces=NS) == '1.2.3.4'
+        assert tree.findtext('.//ns:DiscoveryJob//ns:IPAddressList/ns:IPAddress', namespaces=NS) == '1.1.1.1'
+        assert tree.find('.//ns:DiscoveryJob', namespaces=NS).get('identifier')
+
+    def test_formatted_csv_device_entry(self):
+        """seed file line has all 36 columns and quotes fields containing separators."""
+        line = self.cspc.get_formatted_csv_device_entry('1.1.1.1', 'host,"1"', 'user', 'pass', snmp_v2_RO='public')
+        assert line == '1.1.1.1,"host,""1""",,,,,,,public,,,,,,,,user,pass,,,,,,,,,,,,,,,,,,\n'
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import io
+import pathlib
+import tempfile
+import unittest
+import os
+import sys
+import requests
+#Import cspc_api using the directory one level up as root
+path = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(path)
+from cspc_api import CspcApi, ElementTree
+
+CSV = 'IP Address,Host Name\n1.2.3.4,switch1\n'
+
+class Test_Seedfile(unittest.TestCase):
+    def setUp(self):
+        self.cspc = CspcApi("1.1.1.1", "user", "pw", True)
+        self.sent = []
+        self.cspc.session.send = self.send
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(b'<Response/>')
+        return response
+
+    def parts(self):
+        """Returns the multipart body of the sent request split into its parts"""
+        request = self.sent[-1]
+        boundary = request.headers['Content-Type'].split('boundary=')[1].encode('utf-8')
+        return request.body.split(b'--' + boundary)[1:-1]
+
+    def check_upload(self, csv, device_group_name='group'):
+        assert self.cspc.send_and_import_seed_file_csv(csv, device_group_name) == '<Response/>'
+        request_part, file_part = self.parts()
+        assert b'name="file"' in file_part
+        assert file_part.endswith(CSV.encode('utf-8') + b'\r\n')
+        return ElementTree.fromstring(request_part.split(b'\r\n\r\n', 1)[1].strip())
+
+    def test_seedfile_str(self):
+        """a csv string is uploaded as the file part."""
+        self.check_upload(CSV)
+
+    def test_seedfile_file_object(self):
+        """an opened file is uploaded as is."""
+        self.check_upload(io.BytesIO(CSV.encode('utf-8')))
+
+    def test_seedfile_path(self):
+        """an os.PathLike is opened and its content uploaded."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = pathlib.Path(tmp) / 'seed.csv'
+            csv_path.write_bytes(CSV.encode('utf-8'))
+            self.check_upload(csv_path)
+
+    def test_seedfile_escaped_group(self):
+        """the device group name is escaped in the DeviceGroup and SeedFileName elements."""
+        tree = self.check_upload(CSV, 'a&b<c')
+        assert tree.findtext('.//DeviceGroup') == 'a&b<c'
+        assert tree.findtext('.//SeedFileName').startswith('a&b<c-')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import os
+import sys
+#Import cspc_api using the directory one level up as root
+path = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(path)
+import xmltodict
+from cspc_api import CspcApi, ElementTree
+
+DEVICE = b'''<Device status="x">
+    <Id>31591</Id>
+    <HostName>switch1</HostName>
+    <ProductFamily><![CDATA[Cisco Catalyst 2960-S Series Switches]]></ProductFamily>
+    <Image></Image>
+    <IPAddressList><IPAddress>1.1.1.1</IPAddress><IPAddress>1.1.1.2</IPAddress></IPAddressList>
+    <Vendor vendorId="9">Cisco Systems Inc.</Vendor>
+</Device>'''
+
+class Test_XmlToJson(unittest.TestCase):
+    def test_elem_matches_xmltodict(self):
+        """converting an Element gives the same dict as xmltodict on its serialized form."""
+        cspc = CspcApi("1.1.1.1", "user", "pw", True)
+        assert cspc.xml_to_json_elem(ElementTree.fromstring(DEVICE)) == xmltodict.parse(DEVICE)
+
+    def test_mixed_text_matches_xmltodict(self):
+        """text before, between and after child elements is joined like xmltodict does."""
+        cspc = CspcApi("1.1.1.1", "user", "pw", True)
+        for xml in (b'<a>t1<b>1</b>t2</a>', b'<a>t1<b>1</b> t2 <c/>t3</a>', b'<a x="1">\n  <b>1</b>\n</a>'):
+            assert cspc.xml_to_json_elem(ElementTree.fromstring(xml)) == xmltodict.parse(xml)
+
+    def test_namespaces_dropped(self):
+        """namespaced elements are reported by local name, without '@xmlns'."""
+        cspc = CspcApi("1.1.1.1", "user", "pw", True)
+        xml = b'<Request xmlns="http://www.parinetworks.com/api/schemas/1.1"><Id>1</Id></Request>'
+        assert cspc.xml_to_json_elem(ElementTree.fromstring(xml)) == {'Request': {'Id': '1'}}
+
+if __name__ == '__main__':
+    unittest.main()